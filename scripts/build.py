@@ -3,31 +3,104 @@
 # Note that there is also the isolang.rs crate
 
 import argparse
+import hashlib
+import io
 import json
+import os
 import re
-from dataclasses import dataclass
+import sys
+import time
 from pathlib import Path
 from typing import Any
 
-
-@dataclass
-class Lang:
-    iso: str
-    language: str
-    display_name: str
-    flag: str
-    # https://github.com/tatuylonen/wiktextract/tree/master/src/wiktextract/extractor
-    has_edition: bool
-
-
-@dataclass
-class WhitelistedTag:
-    short_tag: str
-    category: str
-    sort_order: str
-    # if array, first element will be used, others are aliases
-    long_tag_aliases: str | list[str]
-    popularity_score: int
+from common import Lang, WhitelistedTag, load_lang
+
+YOMITAN_DESCRIPTORS_URL = "https://raw.githubusercontent.com/yomidevs/yomitan/master/ext/js/language/language-descriptors.js"
+YOMITAN_DESCRIPTORS_CACHE = Path.home() / ".cache" / "wty" / "language-descriptors.js"
+YOMITAN_DESCRIPTORS_TTL = 24 * 60 * 60
+"""Seconds after which the cached yomitan descriptors are fetched again."""
+
+# ~ we assume that there is no inner lists [] in the descriptors.
+YOMITAN_DESCRIPTORS_RE = re.compile(
+    rb"const languageDescriptors\s*=\s*\[(.*?)\];", re.DOTALL
+)
+# Quick and dirty regex to get iso/names in a single pass.
+# Both run on the raw bytes: only the captured groups get decoded.
+YOMITAN_ISO_NAME_RE = re.compile(rb"iso: '([^']*)',|name: '([^']*)',")
+
+# Highlights the isos that have an edition in help_isos_coloured
+ANSI_GREEN = "\x1b[32m"
+ANSI_RESET = "\x1b[0m"
+
+
+# The part of lang.rs that does not depend on languages.json
+EDITION_SPEC_RS = """\
+#[derive(Debug, Clone, Copy, Serialize, Deserialize, PartialEq, Eq, Hash)]
+pub enum EditionSpec {
+    /// All editions
+    All,
+    /// An `Edition`
+    One(Edition),
+}
+
+impl EditionSpec {
+    pub fn variants(&self) -> Vec<Edition> {
+        match self {
+            Self::All => Edition::all(),
+            Self::One(lang) => vec![*lang],
+        }
+    }
+}
+
+impl From<Edition> for EditionSpec {
+    fn from(val: Edition) -> Self {
+        Self::One(val)
+    }
+}
+
+impl TryInto<Edition> for EditionSpec {
+    type Error = &'static str;
+
+    fn try_into(self) -> Result<Edition, Self::Error> {
+        match self {
+            Self::All => Err("cannot convert from All"),
+            Self::One(lang) => Ok(lang),
+        }
+    }
+}
+
+impl FromStr for EditionSpec {
+    type Err = String;
+
+    fn from_str(s: &str) -> Result<Self, Self::Err> {
+        match s {
+            "all" => Ok(Self::All),
+            other => Ok(Self::One(Edition::from_str(other)?)),
+        }
+    }
+}
+
+impl AsRef<str> for EditionSpec {
+    fn as_ref(&self) -> &str {
+        match self {
+            Self::All => "all",
+            Self::One(lang) => lang.as_ref(),
+        }
+    }
+}
+
+impl Display for EditionSpec {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        f.write_str(self.as_ref())
+    }
+}
+"""
+
+
+def rust_str_array(xs: list[str]) -> str:
+    """Render a list of strings as a Rust array literal: ["a", "b"]."""
+    escaped = (x.replace("\\", "\\\\").replace('"', '\\"') for x in xs)
+    return "[" + ", ".join(f'"{x}"' for x in escaped) + "]"
 
 
 def write_warning(f) -> None:
@@ -61,8 +134,7 @@ def generate_tags_rs(
     write_warning(f)
 
     w(f"pub const TAG_ORDER: [&str; {len(tag_order)}] = [\n")
-    for tag in tag_order:
-        w(f'{idt}"{tag}",\n')
+    w("".join(f'{idt}"{tag}",\n' for tag in tag_order))
     w("];\n\n")
 
     # Not sure why all of this was done in the original, it makes almost no sense
@@ -71,37 +143,47 @@ def generate_tags_rs(
     w(
         f"pub const TAG_BANK: [(&str, &str, i32, &[&str], i32); {len(whitelisted_tags)}] = [\n"
     )
+    rows = []
     for wt in whitelisted_tags:
-        longs_as_list = (
-            wt.long_tag_aliases
-            if isinstance(wt.long_tag_aliases, list)
-            else [wt.long_tag_aliases]
-        )
-        longs_str = str(longs_as_list).replace("'", '"')
-        w(
+        longs_str = rust_str_array(wt.long_tag_aliases)
+        rows.append(
             f'{idt}("{wt.short_tag}", "{wt.category}", {wt.sort_order}, &{longs_str}, {wt.popularity_score}),\n'
         )
+    w("".join(rows))
     w("];\n\n")
 
-    wts_pos = []
-    for wt in whitelisted_tags:
-        if wt.category == "partOfSpeech":
-            if isinstance(wt.long_tag_aliases, list):
-                for alias in wt.long_tag_aliases:
-                    wts_pos.append((alias, wt.short_tag))
-            else:
-                wts_pos.append((wt.long_tag_aliases, wt.short_tag))
-
-    w(f"pub const POSES: [(&str, &str); {len(wts_pos)}] = [\n")
-    for long, short in wts_pos:
-        w(f'{idt}("{long}", "{short}"),\n')
+    wts_pos = [wt for wt in whitelisted_tags if wt.category == "partOfSpeech"]
+    n_poses = sum(len(wt.long_tag_aliases) for wt in wts_pos)
+
+    w(f"pub const POSES: [(&str, &str); {n_poses}] = [\n")
+    w(
+        "".join(
+            f'{idt}("{long}", "{wt.short_tag}"),\n'
+            for wt in wts_pos
+            for long in wt.long_tag_aliases
+        )
+    )
     w("];\n")
 
 
+def display_impl(name: str) -> list[str]:
+    """Display through AsRef<str>, shared by every type of lang.rs."""
+    idt = " " * 4
+    return [
+        f"impl Display for {name} {{\n",
+        f"{idt}fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {{\n",
+        f"{idt * 2}f.write_str(self.as_ref())\n",
+        f"{idt}}}\n",
+        "}\n",
+    ]
+
+
 def generate_lang_rs(langs: list[Lang], f) -> None:
     idt = " " * 4
     w = f.write  # shorthand
 
+    editions = [lang for lang in langs if lang.has_edition]
+
     write_warning(f)
 
     # w("#![rustfmt::skip]\n")
@@ -128,9 +210,9 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     ]
     w("// The idea is from https://github.com/johnstonskj/rust-codes/tree/main\n")
     w(f"pub trait Code: {' + '.join(shared_traits)} {{}}\n\n")
-    w("impl Code for Lang {}\n")
-    w("impl Code for EditionSpec {}\n")
-    w("impl Code for Edition {}\n")
+    f.writelines(
+        f"impl Code for {name} {{}}\n" for name in ("Lang", "EditionSpec", "Edition")
+    )
     w("\n")
 
     ### Lang start
@@ -138,18 +220,20 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     # Lang
     w("#[derive(Debug, Clone, Copy, Serialize, Deserialize, PartialEq, Eq, Hash)]\n")
     w("pub enum Lang {\n")
-    for lang in langs:
-        w(f"{idt}/// {lang.language}\n")  # doc
-        w(f"{idt}{lang.iso.title()},\n")
+    # The doc comment goes right above each variant
+    w("".join(f"{idt}/// {lang.language}\n{idt}{lang.iso_title},\n" for lang in langs))
     w("}\n\n")
 
     # Lang: From<Edition>
     w("impl From<Edition> for Lang {\n")
     w(f"{idt}fn from(value: Edition) -> Self {{\n")
     w(f"{idt * 2}match value {{\n")
-    for lang in langs:
-        if lang.has_edition:
-            w(f"{idt * 3}Edition::{lang.iso.title()} => Self::{lang.iso.title()},\n")
+    w(
+        "".join(
+            f"{idt * 3}Edition::{lang.iso_title} => Self::{lang.iso_title},\n"
+            for lang in editions
+        )
+    )
     w(f"{idt * 2}}}\n")
     w(f"{idt}}}\n")
     w("}\n\n")
@@ -163,15 +247,15 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     w(f'{idt * 2}"Supported isos: {is_supported}"\n')
     w(f"{idt}}}\n\n")
 
-    coloured_parts = [
-        f"\x1b[32m{lang.iso}\x1b[0m" if lang.has_edition else lang.iso for lang in langs
-    ]
-    isos_colored = " | ".join(coloured_parts)
+    isos_colored = " | ".join(
+        ANSI_GREEN + lang.iso + ANSI_RESET if lang.has_edition else lang.iso
+        for lang in langs
+    )
     w(f"{idt}pub const fn help_isos_coloured() -> &'static str {{\n")
     w(f'{idt * 2}"Supported isos: {isos_colored}"\n')
     w(f"{idt}}}\n\n")
 
-    with_edition = " | ".join(lang.iso for lang in langs if lang.has_edition)
+    with_edition = " | ".join(lang.iso for lang in editions)
     w(f"{idt}pub const fn help_editions() -> &'static str {{\n")
     w(f'{idt * 2}"Supported editions: {with_edition}"\n')
     w(f"{idt}}}\n\n")
@@ -179,16 +263,18 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     # Lang: long. long: Lang::El => "Greek"
     w(f"{idt}pub const fn long(&self) -> &'static str {{\n")
     w(f"{idt * 2}match self {{\n")
-    for lang in langs:
-        w(f'{idt * 3}Self::{lang.iso.title()} => "{lang.language}",\n')
+    w(
+        "".join(
+            f'{idt * 3}Self::{lang.iso_title} => "{lang.language}",\n' for lang in langs
+        )
+    )
     w(f"{idt * 2}}}\n")
     w(f"{idt}}}\n\n")
 
     # Lang: all (iteration)
     w(f"{idt}pub fn all() -> Vec<Self> {{\n")
     w(f"{idt * 2}vec![\n")
-    for lang in langs:
-        w(f"{idt * 3}Self::{lang.iso.title()},\n")
+    w("".join(f"{idt * 3}Self::{lang.iso_title},\n" for lang in langs))
     w(f"{idt * 2}]\n")
     w(f"{idt}}}\n")
     w("}\n\n")
@@ -198,11 +284,12 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     w(f"{idt}type Error = &'static str;\n\n")
     w(f"{idt}fn try_into(self) -> Result<Edition, Self::Error> {{\n")
     w(f"{idt * 2}match self {{\n")
-    for lang in langs:
-        if lang.has_edition:
-            w(
-                f"{idt * 3}Self::{lang.iso.title()} => Ok(Edition::{lang.iso.title()}),\n"
-            )
+    w(
+        "".join(
+            f"{idt * 3}Self::{lang.iso_title} => Ok(Edition::{lang.iso_title}),\n"
+            for lang in editions
+        )
+    )
     w(f'{idt * 3}_ => Err("language has no edition"),\n')
     w(f"{idt * 2}}}\n")
     w(f"{idt}}}\n")
@@ -213,8 +300,12 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     w(f"{idt}type Err = String;\n\n")
     w(f"{idt}fn from_str(s: &str) -> Result<Self, Self::Err> {{\n")
     w(f"{idt * 2}match s.to_lowercase().as_str() {{\n")
-    for lang in langs:
-        w(f'{idt * 3}"{lang.iso.lower()}" => Ok(Self::{lang.iso.title()}),\n')
+    w(
+        "".join(
+            f'{idt * 3}"{lang.iso_lower}" => Ok(Self::{lang.iso_title}),\n'
+            for lang in langs
+        )
+    )
     w(
         f"{idt * 3}_ => Err(format!(\"unsupported iso code '{{s}}'\\n{{}}\", Self::{fn_name}())),\n"
     )
@@ -226,104 +317,44 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     w("impl AsRef<str> for Lang {\n")
     w(f"{idt}fn as_ref(&self) -> &str {{\n")
     w(f"{idt * 2}match self {{\n")
-    for lang in langs:
-        w(f'{idt * 3}Self::{lang.iso.title()} => "{lang.iso.lower()}",\n')
+    w(
+        "".join(
+            f'{idt * 3}Self::{lang.iso_title} => "{lang.iso_lower}",\n'
+            for lang in langs
+        )
+    )
     w(f"{idt * 2}}}\n")
     w(f"{idt}}}\n")
     w("}\n\n")
 
     # Lang: Display
-    w("impl Display for Lang {\n")
-    w(f"{idt}fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {{\n")
-    w(f"{idt * 2}f.write_str(self.as_ref())\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
+    f.writelines(display_impl("Lang"))
+    w("\n")
 
     ### EditionSpec start
 
     # EditionSpec
-    w("#[derive(Debug, Clone, Copy, Serialize, Deserialize, PartialEq, Eq, Hash)]\n")
-    w("pub enum EditionSpec {\n")
-    w(f"{idt}/// All editions\n")
-    w(f"{idt}All,\n")
-    w(f"{idt}/// An `Edition`\n")
-    w(f"{idt}One(Edition),\n")
-    w("}\n\n")
-
-    # EditionSpec: variants (iteration)
-    w("impl EditionSpec {\n")
-    w(f"{idt}pub fn variants(&self) -> Vec<Edition> {{\n")
-    w(f"{idt * 2}match self {{\n")
-    w(f"{idt * 3}Self::All => Edition::all(),\n")
-    w(f"{idt * 3}Self::One(lang) => vec![*lang],\n")
-    w(f"{idt * 2}}}\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
-
-    # EditionSpec: From<Edition>
-    w("impl From<Edition> for EditionSpec {\n")
-    w(f"{idt}fn from(val: Edition) -> Self {{\n")
-    w(f"{idt * 2}Self::One(val)\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
-
-    # EditionSpec: TryInto<Edition>
-    w("impl TryInto<Edition> for EditionSpec {\n")
-    w(f"{idt}type Error = &'static str;\n\n")
-    w(f"{idt}fn try_into(self) -> Result<Edition, Self::Error> {{\n")
-    w(f"{idt * 2}match self {{\n")
-    w(f'{idt * 3}Self::All => Err("cannot convert from All"),\n')
-    w(f"{idt * 3}Self::One(lang) => Ok(lang),\n")
-    w(f"{idt * 2}}}\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
-
-    # EditionSpec: FromStr
-    w("impl FromStr for EditionSpec {\n")
-    w(f"{idt}type Err = String;\n\n")
-    w(f"{idt}fn from_str(s: &str) -> Result<Self, Self::Err> {{\n")
-    w(f"{idt * 2}match s {{\n")
-    w(f'{idt * 3}"all" => Ok(Self::All),\n')
-    w(f"{idt * 3}other => Ok(Self::One(Edition::from_str(other)?)),\n")
-    w(f"{idt * 2}}}\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
-
-    # EditionSpec: AsRef<&str>
-    w("impl AsRef<str> for EditionSpec {\n")
-    w(f"{idt}fn as_ref(&self) -> &str {{\n")
-    w(f"{idt * 2}match self {{\n")
-    w(f'{idt * 3}Self::All => "all",\n')
-    w(f"{idt * 3}Self::One(lang) => lang.as_ref(),\n")
-    w(f"{idt * 2}}}\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
-
-    # EditionSpec: Display
-    w("impl Display for EditionSpec {\n")
-    w(f"{idt}fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {{\n")
-    w(f"{idt * 2}f.write_str(self.as_ref())\n")
-    w(f"{idt}}}\n")
-    w("}\n\n")
+    w(EDITION_SPEC_RS)
+    w("\n")
 
     ### Edition start
 
     # Edition
     w("#[derive(Debug, Clone, Copy, Serialize, Deserialize, PartialEq, Eq, Hash)]\n")
     w("pub enum Edition {\n")
-    for lang in langs:
-        if lang.has_edition:
-            w(f"{idt}/// {lang.language}\n")  # doc
-            w(f"{idt}{lang.iso.title()},\n")
+    # The doc comment goes right above each variant
+    w(
+        "".join(
+            f"{idt}/// {lang.language}\n{idt}{lang.iso_title},\n" for lang in editions
+        )
+    )
     w("}\n\n")
 
     # Edition: all (iteration)
     w("impl Edition {\n")
     w(f"{idt}pub fn all() -> Vec<Self> {{\n")
     w(f"{idt * 2}vec![\n")
-    for lang in langs:
-        if lang.has_edition:
-            w(f"{idt * 3}Self::{lang.iso.title()},\n")
+    w("".join(f"{idt * 3}Self::{lang.iso_title},\n" for lang in editions))
     w(f"{idt * 2}]\n")
     w(f"{idt}}}\n")
     w("}\n\n")
@@ -333,9 +364,12 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     w(f"{idt}type Err = String;\n\n")
     w(f"{idt}fn from_str(s: &str) -> Result<Self, Self::Err> {{\n")
     w(f"{idt * 2}match s.to_lowercase().as_str() {{\n")
-    for lang in langs:
-        if lang.has_edition:
-            w(f'{idt * 3}"{lang.iso.lower()}" => Ok(Self::{lang.iso.title()}),\n')
+    w(
+        "".join(
+            f'{idt * 3}"{lang.iso_lower}" => Ok(Self::{lang.iso_title}),\n'
+            for lang in editions
+        )
+    )
     w(f"{idt * 3}_ => Err(format!(\"invalid edition '{{s}}'\")),\n")
     w(f"{idt * 2}}}\n")
     w(f"{idt}}}\n")
@@ -345,90 +379,115 @@ def generate_lang_rs(langs: list[Lang], f) -> None:
     w("impl AsRef<str> for Edition {\n")
     w(f"{idt}fn as_ref(&self) -> &str {{\n")
     w(f"{idt * 2}match self {{\n")
-    for lang in langs:
-        if lang.has_edition:
-            w(f'{idt * 3}Self::{lang.iso.title()} => "{lang.iso.lower()}",\n')
+    w(
+        "".join(
+            f'{idt * 3}Self::{lang.iso_title} => "{lang.iso_lower}",\n'
+            for lang in editions
+        )
+    )
     w(f"{idt * 2}}}\n")
     w(f"{idt}}}\n")
     w("}\n\n")
 
     # Edition: Display
-    w("impl Display for Edition {\n")
-    w(f"{idt}fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {{\n")
-    w(f"{idt * 2}f.write_str(self.as_ref())\n")
-    w(f"{idt}}}\n")
-    w("}\n")
+    f.writelines(display_impl("Edition"))
 
 
-def load_lang(item: Any) -> Lang:
-    return Lang(
-        item["iso"],
-        item["language"],
-        item["displayName"],
-        item["flag"],
-        item.get("hasEdition", False),
-    )
+def write_json(path: Path, data: Any) -> None:
+    """Write data as formatted json @ path, unless it is already formatted."""
+    # Serialize in memory: json.dump writes every chunk of the encoder separately
+    content = json.dumps(data, indent=4, ensure_ascii=False).encode("utf-8")
+    # Do not touch the mtime if nothing changed
+    if path.exists() and path.read_bytes() == content:
+        return
+    path.write_bytes(content)
 
 
-def load_langs(path: Path) -> list[Lang]:
-    with path.open() as f:
-        data = json.load(f)
-    return [load_lang(item) for item in data]
+def write_rs(path: Path, code: str, force: bool = False) -> None:
+    """Replace the rust file @ path atomically, unless it already has this code.
 
+    Watchers (rust-analyzer, cargo watch) then never see a half written file,
+    and an identical file keeps its mtime so cargo does not rebuild.
 
-def sort_languages_json(path: Path) -> None:
-    with path.open() as f:
-        text = f.read()
+    This is finer than the build digest in main: the digest skips the whole
+    generation, while this still skips a file whose output did not change (say,
+    tags_constants.rs when only languages.json was edited).
+    """
+    content = code.encode("utf-8")
+    if not force and path.exists() and path.read_bytes() == content:
+        print(f"✓ Rust code is up to date @ {path}")
+        return
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    print(f"Wrote rust code @ {path}")
 
-    lines = text.splitlines()
-    langs = [
-        (load_lang(json.loads(line.strip(","))), idx)
-        for idx, line in enumerate(lines[1:-1])
-    ]
 
-    langs_sorted = sorted(langs, key=lambda pair: pair[0].display_name)
-    if langs == langs_sorted:
-        return
+def sort_languages_json(path: Path) -> list[Lang]:
+    """Sort languages.json by display name and return the sorted languages.
+
+    The file is aligned by hand with one language per line, so we reorder lines
+    instead of dumping the json again.
+    """
+    text = path.read_text(encoding="utf-8")
+    langs = [load_lang(item) for item in json.loads(text)]
 
-    with path.open("w") as f:
-        f.write("[\n")
-        for _, idx in langs_sorted:
-            f.write(lines[idx + 1])
-            f.write("\n")
-        f.write("]\n")
+    # Skip the brackets. The trailing comma is added back when joining.
+    lines = [line.rstrip(",") for line in text.splitlines()[1:-1]]
+    assert len(lines) == len(langs), f"Expected one language per line @ {path}"
+
+    display_names = [lang.display_name for lang in langs]
+    order = sorted(range(len(langs)), key=display_names.__getitem__)
+    if order == list(range(len(langs))):
+        return langs
+
+    sorted_lines = ",\n".join(lines[idx] for idx in order)
+    path.write_bytes(f"[\n{sorted_lines}\n]\n".encode())
+    return [langs[idx] for idx in order]
+
+
+def fetch_yomitan_descriptors() -> bytes:
+    """Get the yomitan language descriptors, cached on disk for a day."""
+    cache_path = YOMITAN_DESCRIPTORS_CACHE
+    if (
+        cache_path.exists()
+        and time.time() - cache_path.stat().st_mtime < YOMITAN_DESCRIPTORS_TTL
+    ):
+        return cache_path.read_bytes()
+
+    import requests
+
+    response = requests.get(YOMITAN_DESCRIPTORS_URL, timeout=10)
+    response.raise_for_status()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_bytes(response.content)
+    return response.content
 
 
 def check_yomitan_langs(langs: list[Lang]) -> None:
     """Check if we support at least what is supported by yomitan.
 
     Since it sends a request, it is gated under the --check-yomitan flag.
+    The response is cached @ YOMITAN_DESCRIPTORS_CACHE.
     """
-    import requests
-
-    url = "https://raw.githubusercontent.com/yomidevs/yomitan/master/ext/js/language/language-descriptors.js"
-    response = requests.get(url)
-    response.raise_for_status()
-    js_text = response.text
+    js_bytes = fetch_yomitan_descriptors()
 
     # Get iso and names
-    # ~ we assume that there is no inner lists [] in the descriptors.
-    mch = re.search(r"const languageDescriptors\s*=\s*\[(.*?)\];", js_text, re.DOTALL)
+    mch = YOMITAN_DESCRIPTORS_RE.search(js_bytes)
     if not mch:
         print("Regex didn't match")
         return
     content = mch.group(1)
 
-    # Quick and dirty regex to get iso/names
-    iso_re = re.compile(r"iso: '(.*)',")
-    name_re = re.compile(r"name: '(.*)',")
     isos = []
     names = []
 
-    for line in content.splitlines():
-        if iso_match := iso_re.search(line):
-            isos.append(iso_match.group(1))
-        if name_match := name_re.search(line):
-            names.append(name_match.group(1))
+    for field in YOMITAN_ISO_NAME_RE.finditer(content):
+        iso, name = field.groups()
+        if iso is not None:
+            isos.append(iso.decode("utf-8"))
+        else:
+            names.append(name.decode("utf-8"))
     assert len(isos) == len(names)
 
     our_iso_map = {lang.iso: lang for lang in langs}
@@ -448,11 +507,8 @@ def check_yomitan_langs(langs: list[Lang]) -> None:
                 # * we:      language='Arabic', display_name='Arabic, MSA',
                 #
                 # In this case the name is different but it is fine.
-                if ", " in our_lang.display_name:
-                    main, variant = our_lang.display_name.split(", ")
-                    rebuilt = f"{main} ({variant})"
-                    if ymt_name == rebuilt:
-                        continue
+                if ymt_name == our_lang.display_rebuilt:
+                    continue
 
                 # We have this iso, but the name is different
                 different_name = f"[different name] {ymt_name=} but {our_lang=}"
@@ -477,7 +533,7 @@ def check_kaikki_langs(langs: list[Lang]) -> None:
     import requests
 
     url = "https://kaikki.org/dictionary/"
-    response = requests.get(url)
+    response = requests.get(url, timeout=10)
     response.raise_for_status()
     response.encoding = "utf-8"
     text = response.text
@@ -503,10 +559,27 @@ def check_kaikki_langs(langs: list[Lang]) -> None:
             print(f"[missing from English kaikki ({upto})] {lang}, {num_senses}")
 
 
+def build_digest(*paths: Path) -> str:
+    """Hash the given paths together with this script and common.py.
+
+    Used to skip the code generation if neither the inputs, the outputs, nor
+    this script changed since the last run.
+    """
+    hasher = hashlib.blake2b()
+    for path in (Path(__file__), Path(__file__).with_name("common.py"), *paths):
+        hasher.update(path.read_bytes())
+    return hasher.hexdigest()
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--check-yomitan", action="store_true")
     parser.add_argument("--check-kaikki", action="store_true")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate and rewrite the rust code even if nothing changed",
+    )
     args = parser.parse_args()
     check_yomitan = args.check_yomitan
     check_kaikki = args.check_kaikki
@@ -514,6 +587,7 @@ def main() -> None:
     src = Path("src")
     path_lang_rs = src / "lang.rs"
     path_tags_rs = src / "tags" / "tags_constants.rs"
+    path_build_hash = src / ".build.hash"
     jsons_root = Path("assets")
     path_languages_json = jsons_root / "languages.json"
     path_tag_order_json = jsons_root / "tag_order.json"
@@ -524,13 +598,11 @@ def main() -> None:
         path_tag_order_json,
         path_tag_bank_json,
     ):
-        if not path.exists:
+        if not path.exists():
             print(f"Path does not exist @ {path}")
-            return
+            sys.exit(1)
 
-    sort_languages_json(path_languages_json)
-
-    langs = load_langs(path_languages_json)
+    langs = sort_languages_json(path_languages_json)
 
     if check_kaikki:
         check_kaikki_langs(langs)
@@ -539,30 +611,45 @@ def main() -> None:
         check_yomitan_langs(langs)
 
     tag_order: list[str] = []
-    with path_tag_order_json.open() as f:
-        data = json.load(f)
-        for _, tags in data.items():
-            tag_order.extend(tags)
+    data = json.loads(path_tag_order_json.read_bytes())
+    for _, tags in data.items():
+        tag_order.extend(tags)
     # Overwrite to ensure formatting
-    with path_tag_order_json.open("w") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-    with path_tag_bank_json.open() as f:
-        data = json.load(f)
+    write_json(path_tag_order_json, data)
+    data = json.loads(path_tag_bank_json.read_bytes())
     whitelisted_tags = [WhitelistedTag(*row) for row in data]
     # Overwrite to ensure formatting
-    with path_tag_bank_json.open("w") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    write_json(path_tag_bank_json, data)
 
     # import sys
     # generate_lang_rs(langs, sys.stdout)
     # generate_tags_rs(tag_order, sys.stdout)
 
-    with path_lang_rs.open("w") as f:
-        generate_lang_rs(langs, f)
-        print(f"Wrote rust code @ {path_lang_rs}")
-    with path_tags_rs.open("w") as f:
-        generate_tags_rs(tag_order, whitelisted_tags, f)
-        print(f"Wrote rust code @ {path_tags_rs}")
+    build_paths = (
+        path_languages_json,
+        path_tag_order_json,
+        path_tag_bank_json,
+        path_lang_rs,
+        path_tags_rs,
+    )
+    if (
+        not args.force
+        and all(path.exists() for path in (*build_paths, path_build_hash))
+        and path_build_hash.read_text() == build_digest(*build_paths)
+    ):
+        print("✓ Rust code is up to date")
+        return
+
+    # Generate in memory and write once: the generators issue many small writes
+    buf = io.StringIO()
+    generate_lang_rs(langs, buf)
+    write_rs(path_lang_rs, buf.getvalue(), force=args.force)
+
+    buf = io.StringIO()
+    generate_tags_rs(tag_order, whitelisted_tags, buf)
+    write_rs(path_tags_rs, buf.getvalue(), force=args.force)
+
+    path_build_hash.write_text(build_digest(*build_paths))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+"""Types shared by the scripts that read the assets jsons."""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(slots=True)
+class Lang:
+    iso: str
+    language: str
+    display_name: str
+    flag: str
+    # https://github.com/tatuylonen/wiktextract/tree/master/src/wiktextract/extractor
+    has_edition: bool
+    # Computed once at load time, since the generators use them for every variant
+    iso_title: str  # El
+    iso_lower: str  # el
+    # The display name as yomitan writes it: Arabic, MSA > Arabic (MSA)
+    display_rebuilt: str
+
+
+@dataclass(slots=True)
+class WhitelistedTag:
+    short_tag: str
+    category: str
+    sort_order: str
+    # if array, first element will be used, others are aliases
+    long_tag_aliases: list[str]
+    popularity_score: int
+
+    def __post_init__(self) -> None:
+        # The json allows a single string when there are no aliases
+        if isinstance(self.long_tag_aliases, str):
+            self.long_tag_aliases = [self.long_tag_aliases]
+
+
+def rebuild_display_name(display_name: str) -> str:
+    if ", " not in display_name:
+        return display_name
+    main, variant = display_name.split(", ")
+    return f"{main} ({variant})"
+
+
+def load_lang(item: Any) -> Lang:
+    return Lang(
+        item["iso"],
+        item["language"],
+        item["displayName"],
+        item["flag"],
+        item.get("hasEdition", False),
+        iso_title=item["iso"].title(),
+        iso_lower=item["iso"].lower(),
+        display_rebuilt=rebuild_display_name(item["displayName"]),
+    )
+
+
+def load_langs(path: Path) -> list[Lang]:
+    data = json.loads(path.read_bytes())
+    return [load_lang(item) for item in data]
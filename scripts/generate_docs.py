@@ -1,9 +1,8 @@
 """Generate a single static downloads page with dropdowns."""
 
-import json
-from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+
+from common import Lang, load_langs
 
 REPO_ID = "daxida/wty-release"
 REPO_URL = f"https://huggingface.co/datasets/{REPO_ID}"
@@ -11,35 +10,6 @@ BASE_URL = f"{REPO_URL}/resolve/main/dict"
 """https://huggingface.co/datasets/daxida/wty-release/resolve/main/dict"""
 
 
-# duplicated from build
-@dataclass
-class Lang:
-    iso: str
-    language: str
-    display_name: str
-    flag: str
-    # https://github.com/tatuylonen/wiktextract/tree/master/src/wiktextract/extractor
-    has_edition: bool
-
-
-# duplicated from build
-def load_lang(item: Any) -> Lang:
-    return Lang(
-        item["iso"],
-        item["language"],
-        item["displayName"],
-        item["flag"],
-        item.get("hasEdition", False),
-    )
-
-
-# duplicated from build
-def load_langs(path: Path) -> list[Lang]:
-    with path.open() as f:
-        data = json.load(f)
-    return [load_lang(item) for item in data]
-
-
 def render_line(
     label: str, dtype: str, target_options: str, source_options: str | None = None
 ) -> str:
@@ -158,6 +128,15 @@ For a list of supported languages by Yomitan, see [here](https://yomitan.wiki/su
 """.strip()
 
 
+def write_page(path: Path, content: str) -> None:
+    # Leave the page (and mkdocs serve) alone if nothing changed
+    data = content.encode("utf-8")
+    if path.exists() and path.read_bytes() == data:
+        print(f"✓ Unchanged, not rewritten @ {path}")
+        return
+    path.write_bytes(data)
+
+
 def main() -> None:
     path_language_json = Path("assets/languages.json")
     path_docs = Path("docs")
@@ -171,10 +150,10 @@ def main() -> None:
     print(f"Found {len(all_langs)} languages, {len(editions)} with edition")
 
     print(f"Generating downloads page @ {path_download}")
-    path_download.write_text(generate_downloads_page(all_langs, editions))
+    write_page(path_download, generate_downloads_page(all_langs, editions))
 
     print(f"Generating language page @ {path_language}")
-    path_language.write_text(generate_language_page(all_langs, editions))
+    write_page(path_language, generate_language_page(all_langs, editions))
 
     print("✓ Done!")
 
@@ -9,6 +9,9 @@
 Uploading to the hub requires:
 pip install python-dotenv huggingface-hub
 
+Optionally, to upload faster through the Rust uploader:
+pip install hf_transfer
+
 ---
 
 To modify the huggingface repo:
@@ -21,20 +24,25 @@ git push
 """
 
 import argparse
+import atexit
 import datetime
-import json
+import importlib.util
 import os
 import re
 import shutil
 import subprocess
+import sys
 import time
 import zipfile
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 from pprint import pprint
-from typing import Any, Literal
+from typing import Literal, TextIO
+
+from common import Lang, load_langs
 
 REPO_ID_HF = "daxida/wty-release"
 REPO_HF = f"https://huggingface.co/datasets/{REPO_ID_HF}"
@@ -42,7 +50,10 @@ REPO_ID_GH = "https://github.com/daxida/wty"
 
 BINARY_PATH = "target/release/wty"
 
+CPU_COUNT = os.cpu_count() or 1
+
 ANSI_ESCAPE_RE = re.compile(r"\x1B[@-_][0-?]*[ -/]*[@-~]")
+ANSI_ESCAPE_BRE = re.compile(rb"\x1B[@-_][0-?]*[ -/]*[@-~]")
 
 type DictTy = Literal["main", "ipa", "ipa-merged", "glossary"]
 
@@ -53,6 +64,7 @@ class Args:
     dry_run: bool
     jobs: int
     dtype: DictTy | None
+    resume: bool = False
 
 
 def release_version() -> str:
@@ -89,7 +101,7 @@ class PathManager:
     def check_dict_dir(self) -> None:
         if not self.dictionary.exists() or not any(self.dictionary.iterdir()):
             print(f"No files found in {self.dictionary}")
-            exit(1)
+            sys.exit(1)
 
 
 PM = PathManager(Path("data"))
@@ -97,6 +109,9 @@ PM = PathManager(Path("data"))
 
 
 def clean(line: str) -> str:
+    # Most lines have no colour at all: skip the regex for them
+    if "\x1b" not in line:
+        return line
     return ANSI_ESCAPE_RE.sub("", line)
 
 
@@ -105,7 +120,7 @@ def double_check(msg: str = "") -> None:
         print(msg)
     if input("Proceed? [y/n] ") != "y":
         print("Exiting.")
-        exit(1)
+        sys.exit(1)
 
 
 def human_size(size_bytes: float, precision: int = 2) -> str:
@@ -116,22 +131,40 @@ def human_size(size_bytes: float, precision: int = 2) -> str:
     return f"{size_bytes:.{precision}f} GB"
 
 
+def iter_files(path: Path | str) -> Iterator[os.DirEntry[str]]:
+    """Recursively yield the files under path.
+
+    Unlike rglob + is_file + stat, scandir entries reuse what the directory
+    listing already returned, which saves a syscall or two per file.
+    """
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path)
+            elif entry.is_file():
+                yield entry
+
+
 def stats(
     path: Path,
     *,
-    file_pattern: str | None = None,
+    file_pattern: re.Pattern[str] | None = None,
     endswith: str | None = None,
 ) -> tuple[int, str]:
     n_files = 0
     size_files = 0
-    for f in path.rglob("*"):
-        if f.is_file():
-            if file_pattern is not None and not re.match(file_pattern, f.name):
-                continue
-            if endswith is not None and not f.name.endswith(endswith):
-                continue
-            n_files += 1
-            size_files += f.stat().st_size
+    for entry in iter_files(path):
+        # Filter by name first, so that skipped files are never stat'ed
+        if endswith is not None and not entry.name.endswith(endswith):
+            continue
+        if file_pattern is not None and not file_pattern.fullmatch(entry.name):
+            continue
+        n_files += 1
+        size_files += entry.stat().st_size
     return n_files, human_size(size_files)
 
 
@@ -154,7 +187,9 @@ def prepare_stage() -> None:
             ├── README.md
             └── log.txt
 
-    We copy (not move) files so the local release directory remains intact.
+    We copy (not move) files so the local release directory remains intact. Not
+    hardlinks: wty rewrites a dictionary zip in place (File::create truncates it), so
+    a rebuild would silently change the staged files too.
 
     The README and log shown on the Hugging Face repo root are handled
     separately and do not require upload_large_folder.
@@ -163,15 +198,20 @@ def prepare_stage() -> None:
 
     for destination in (PM.version, PM.latest):
         print(f"Copying release to {destination}...")
-        shutil.copytree(str(PM.dictionary), destination / "dict")
-        shutil.copytree(str(PM.index), destination / "index")
+        shutil.copytree(PM.dictionary, destination / "dict")
+        shutil.copytree(PM.index, destination / "index")
 
 
 # https://huggingface.co/new-dataset
 # https://huggingface.co/settings/tokens
 def upload_to_huggingface() -> None:
+    # Must be set before huggingface_hub is imported. Opt-in since enabling it
+    # without the wheel installed makes huggingface_hub raise.
+    if importlib.util.find_spec("hf_transfer") is not None:
+        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
     from dotenv import load_dotenv
-    from huggingface_hub import HfApi, whoami
+    from huggingface_hub import CommitOperationAdd, HfApi, whoami
 
     PM.check_dict_dir()
 
@@ -218,24 +258,33 @@ def upload_to_huggingface() -> None:
     readme_path = PM.readme
     update_readme_local(readme_path, commit_sha, version)
 
-    for folder_in_repo in ("", f"versions/{release_version()}", "latest"):
-        api.upload_file(
-            path_or_fileobj=str(readme_path),
-            path_in_repo=f"{folder_in_repo}/README.md",
-            repo_id=REPO_ID_HF,
-            repo_type="dataset",
-            commit_message=f"[{version}] update README",
+    # A single commit for all of them, instead of one commit (and one round trip)
+    # per file
+    operations = []
+    folders_in_repo = ("", f"versions/{release_version()}", "latest")
+    for folder_in_repo in folders_in_repo:
+        prefix = f"{folder_in_repo}/" if folder_in_repo else ""
+        operations.append(
+            CommitOperationAdd(
+                path_in_repo=f"{prefix}README.md",
+                path_or_fileobj=str(readme_path),
+            )
         )
-        print(f"Uploaded README @ {folder_in_repo or 'root'}")
-
-        api.upload_file(
-            path_or_fileobj=str(PM.log),
-            path_in_repo=f"{folder_in_repo}/log.txt",
-            repo_id=REPO_ID_HF,
-            repo_type="dataset",
-            commit_message=f"[{version}] update logs",
+        operations.append(
+            CommitOperationAdd(
+                path_in_repo=f"{prefix}log.txt",
+                path_or_fileobj=str(PM.log),
+            )
         )
-        print(f"Uploaded logs @ {folder_in_repo or 'root'}")
+
+    api.create_commit(
+        repo_id=REPO_ID_HF,
+        repo_type="dataset",
+        operations=operations,
+        commit_message=f"[{version}] update README and logs",
+    )
+    for folder_in_repo in folders_in_repo:
+        print(f"Uploaded README and logs @ {folder_in_repo or 'root'}")
 
 
 def update_readme_local(readme_path: Path, commit_sha: str, version: str) -> None:
@@ -261,28 +310,6 @@ logs: [link]({logs_link})
     readme_path.write_text(readme_content, encoding="utf-8")
 
 
-# duplicated from build
-@dataclass
-class Lang:
-    iso: str
-    language: str
-    display_name: str
-    flag: str
-    # https://github.com/tatuylonen/wiktextract/tree/master/src/wiktextract/extractor
-    has_edition: bool
-
-
-# duplicated from build
-def load_lang(item: Any) -> Lang:
-    return Lang(
-        item["iso"],
-        item["language"],
-        item["displayName"],
-        item["flag"],
-        item.get("hasEdition", False),
-    )
-
-
 def build_binary() -> None:
     subprocess.run(
         ["cargo", "build", "--release", "--quiet"],
@@ -303,9 +330,8 @@ def binary_version() -> str:
 def run_cmd(
     root_dir: Path,
     cmd_name: str,
-    # <source>-<target>, <source>-<source>, all, etc.
-    # they are expected to be space separated
-    params: str,
+    # [<source>, <target>], [<source>, <source>], [all], etc.
+    params: list[str],
     args: Args,
     *,
     print_download_status: bool = False,
@@ -313,7 +339,7 @@ def run_cmd(
     cmd = [
         BINARY_PATH,
         cmd_name,
-        *params.split(" "),
+        *params,
         f"--root-dir={root_dir}",
     ]
     # Return logs to guarantee some order
@@ -327,7 +353,9 @@ def run_cmd(
     try:
         result = subprocess.run(
             cmd,
-            capture_output=True,
+            # Without -v nothing reads stdout: do not pipe megabytes to drop them
+            stdout=subprocess.PIPE if args.verbose > 0 else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             check=True,  # check=False ignores errors
         )
     except subprocess.CalledProcessError as e:
@@ -342,35 +370,53 @@ def run_cmd(
         #
         # NOTE: if we go with the database approach, this is pointless since we should never
         # use the preprocessed files.
-        if (
-            cmd_name in ("ipa", "main", "download") and params.split(" ")[1] == "en"
-        ) or (cmd_name == "ipa-merged" and params.split(" ")[0] == "ku"):
-            # print("[warn] Failed to run cmd:", clean(" ".join(cmd)))
+        if (cmd_name in ("ipa", "main", "download") and params[1] == "en") or (
+            cmd_name == "ipa-merged" and params[0] == "ku"
+        ):
             return 0, logs
         log("[err]", f"Command failed: {' '.join(cmd)}")
-        log("[err-stdout]", e.stdout)
+        if e.stdout is not None:
+            log("[err-stdout]", e.stdout)
         log("[err-stderr]", e.stderr)
         raise
 
     match args.verbose:
         case 1:
-            out = result.stdout.decode("utf-8")
+            # Only a few lines are kept: filter the bytes, then decode those
+            out = result.stdout
+            if b"\x1b" in out:
+                out = ANSI_ESCAPE_BRE.sub(b"", out)
             for line in out.splitlines():
-                line = clean(line)
-                if "Wrote yomitan dict" in line:
-                    logs.append(line)
-                if print_download_status and "ownload" in line:
-                    logs.append(line)
+                if b"Wrote yomitan dict" in line:
+                    logs.append(line.decode("utf-8"))
+                if print_download_status and b"ownload" in line:
+                    logs.append(line.decode("utf-8"))
         case 2:
-            out = result.stdout.decode("utf-8")
+            # Strip the whole buffer at once rather than line by line
+            out = clean(result.stdout.decode("utf-8"))
             for line in out.splitlines():
-                line = clean(line)
                 print(line)
                 logs.append(line)
 
     return (result.returncode, logs)
 
 
+_log_file: TextIO | None = None
+
+
+def log_file() -> TextIO:
+    """The log file, opened once and kept open until exit.
+
+    Line buffered: log.txt stays current during a long run, and a killed run keeps
+    every line logged so far.
+    """
+    global _log_file
+    if _log_file is None:
+        _log_file = PM.log.open("a", encoding="utf-8", buffering=1)
+        atexit.register(_log_file.close)
+    return _log_file
+
+
 def log(*values, **kwargs) -> None:
     """Poor man's loguru"""
     line = ""
@@ -387,14 +433,12 @@ def log(*values, **kwargs) -> None:
             raise RuntimeError
 
     print(line, **kwargs)
-
-    # Bad bad bad
-    with PM.log.open("a") as f:
-        f.write(line + "\n")
+    log_file().write(line + "\n")
 
 
 # see path.rs::dict_name_expanded
-def pattern(dict_ty: DictTy, sources: list[str], targets: list[str]) -> str:
+def pattern(dict_ty: DictTy, sources: list[str], targets: list[str]) -> re.Pattern[str]:
+    """Compiled once per dict type. Meant to be used with fullmatch."""
     sources_re = "|".join(sources)
     targets_re = "|".join(targets)
 
@@ -410,24 +454,68 @@ def pattern(dict_ty: DictTy, sources: list[str], targets: list[str]) -> str:
         case "glossary":
             fp = rf"wty-({sources_re})-({targets_re})-gloss\.zip"
 
-    return fp
+    return re.compile(fp)
+
+
+# see path.rs::dict_name_expanded
+def dict_zip_name(dict_ty: DictTy, source: str, target: str) -> str:
+    """The zip made by make_dict for this cell of the matrix."""
+    match dict_ty:
+        case "main":
+            return f"wty-{target}-{source}.zip"
+        case "ipa":
+            return f"wty-{target}-{source}-ipa.zip"
+        case "ipa-merged":
+            return f"wty-{source}-ipa.zip"
+        case "glossary":
+            return f"wty-{source}-{target}-gloss.zip"
+
+
+def is_complete_zip(path: str) -> bool:
+    """False for a zip left half written by a killed run.
+
+    wty writes the zip in place, so its name alone does not mean it was finished.
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            zf.getinfo("index.json")
+    except (OSError, zipfile.BadZipFile, KeyError):
+        return False
+    return True
+
+
+def make_dict(
+    odir: Path, args: Args, dict_ty: DictTy, source: str, target: str
+) -> tuple[int, list[str]]:
+    """Worker of run_matrix: make one dictionary of the matrix."""
+    match dict_ty:
+        case "main" | "ipa":
+            params = [target, source]
+        case "glossary":
+            # Ignore these
+            if source == target:
+                return 0, []
+            params = [source, target]
+        case "ipa-merged":
+            params = [source]
+        case _:
+            raise RuntimeError("invalid dict_ty")
+    return run_cmd(odir, dict_ty, params, args)
 
 
 def run_matrix(langs: list[Lang], args: Args) -> None:
     start = time.perf_counter()
 
     odir = PM.release
-    n_workers = min(args.jobs, os.cpu_count() or 1)
+    n_workers = min(args.jobs, CPU_COUNT) if args.jobs > 0 else CPU_COUNT
 
     log("info", f"n_workers {n_workers}")
     log("info", args)
-    check_previous_files("info", odir)
-    check_previous_files("info", odir, file_type="zip")
+    check_previous_files("info", odir, "zip")
     log()
 
     # Clear logs
-    with PM.log.open("w") as f:
-        f.write("")
+    log_file().truncate(0)
 
     run_prelude()
 
@@ -488,68 +576,83 @@ def run_matrix(langs: list[Lang], args: Args) -> None:
     # NOTE: when testing with subsets, if ipa-merged is in the matrix we will download all editions...
     run_download(odir, isos, with_edition, args)
 
+    # Complete zips left by a previous run, the rest are rebuilt.
+    # Read once: what this run makes is not skipped.
+    done: set[str] = set()
+    if args.resume:
+        done = {
+            e.name
+            for e in iter_files(PM.dictionary)
+            if e.name.endswith(".zip") and is_complete_zip(e.path)
+        }
+        log("ALL", f"Resuming: skipping {len(done)} existing dicts")
+
     log("ALL", "Starting...")
-    for dict_ty, sources, target_lambda in matrix:
-        dict_start = time.perf_counter()
-        log(dict_ty, "Making dictionaries...")
-
-        for source in sources:
-            targets = target_lambda(source)
-            source_start = time.perf_counter()
-            label = f"{source}-{dict_ty}"
-            all_logs: list[str] = []
-
-            def worker(target: str) -> tuple[int, list[str]]:
-                match dict_ty:
-                    case "main" | "ipa":
-                        params = f"{target} {source}"
-                    case "glossary":
-                        # Ignore these
-                        if source == target:
-                            return 0, []
-                        params = f"{source} {target}"
-                    case "ipa-merged":
-                        params = f"{source}"
-                    case _:
-                        raise RuntimeError("invalid dict_ty")
-                return run_cmd(odir, dict_ty, params, args)
-
-            with ThreadPoolExecutor(max_workers=n_workers) as executor:
-                for _, logs in executor.map(worker, targets):
+    # One pool for the whole matrix: the threads are reused across sources
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        for dict_ty, sources, target_lambda in matrix:
+            dict_start = time.perf_counter()
+            log(dict_ty, "Making dictionaries...")
+
+            for source in sources:
+                targets = target_lambda(source)
+                source_start = time.perf_counter()
+                label = f"{source}-{dict_ty}"
+                all_logs: list[str] = []
+
+                todo = [
+                    target
+                    for target in targets
+                    if dict_zip_name(dict_ty, source, target) not in done
+                ]
+                source_worker = partial(make_dict, odir, args, dict_ty, source)
+                for _, logs in executor.map(source_worker, todo):
                     # log("DONE", f"{dict_ty} {source} {target}")
                     all_logs.extend(logs)
 
-            for logline in sorted(all_logs):
-                log(logline)
+                # Quiet runs have nothing to sort
+                if len(all_logs) > 1:
+                    all_logs.sort()
+                for logline in all_logs:
+                    log(logline)
 
-            elapsed = time.perf_counter() - source_start
-            log(label, f"Finished dict ({elapsed:.2f}s)")
+                elapsed = time.perf_counter() - source_start
+                log(label, f"Finished dict ({elapsed:.2f}s)")
 
-        fp = pattern(dict_ty, sources, targets)  # type: ignore
-        _, total_size = stats(odir, file_pattern=fp)
-        elapsed = time.perf_counter() - dict_start
-        log(dict_ty, f"Finished dicts ({elapsed:.2f}s, {total_size})")
+            fp = pattern(dict_ty, sources, targets)  # type: ignore
+            _, total_size = stats(odir, file_pattern=fp)
+            elapsed = time.perf_counter() - dict_start
+            log(dict_ty, f"Finished dicts ({elapsed:.2f}s, {total_size})")
 
     n_dictionaries, total_size = stats(odir, endswith=".zip")
     elapsed = time.perf_counter() - start
     log("ALL", f"Finished! ({elapsed:.2f}s, {total_size}, {n_dictionaries} dicts)")
 
 
-def check_previous_files(label: str, path: Path, file_type: str = "") -> None:
-    if file_type:
-        n_files, total_size = stats(path, endswith=file_type)
-        file_msg = f"{file_type} files"
-    else:
-        n_files, total_size = stats(path)
-        file_msg = "files"
+def check_previous_files(label: str, path: Path, *file_types: str) -> None:
+    """Log the files found @ path, then those of every file_type.
 
-    if n_files > 0:
-        log(
-            label,
-            f"Found previous {file_msg} ({total_size}, {n_files} files) @ {path}",
-        )
-    else:
-        log(label, f"Clean directory. No previous {file_msg} found @ {path}")
+    Everything is counted in a single walk.
+    """
+    # "" is the catch-all: every name ends with it
+    counts = {ft: [0, 0] for ft in ("", *file_types)}
+    for entry in iter_files(path):
+        size = entry.stat().st_size
+        for file_type, count in counts.items():
+            if entry.name.endswith(file_type):
+                count[0] += 1
+                count[1] += size
+
+    for file_type, (n_files, size) in counts.items():
+        file_msg = f"{file_type} files" if file_type else "files"
+        if n_files > 0:
+            total_size = human_size(size)
+            log(
+                label,
+                f"Found previous {file_msg} ({total_size}, {n_files} files) @ {path}",
+            )
+        else:
+            log(label, f"Clean directory. No previous {file_msg} found @ {path}")
 
 
 def run_prelude() -> None:
@@ -569,28 +672,34 @@ def run_download(
     log("dl", "Downloading editions...")
     check_previous_files("dl", PM.download)
 
-    # Download editions (English only downloads the filtered en-en)
-    for source in with_edition:
-        label = f"dl-{source}"
-        params = f"{source} {source}"
+    def download(params: list[str], extract_name: str) -> tuple[list[str], str]:
         _, logs = run_cmd(odir, "download", params, args, print_download_status=True)
-        for logline in logs:
-            log(logline)
-        _, size = stats(PM.download, endswith=f"{source}-extract.jsonl")
-        log(label, f"Finished download ({size})")
+        _, size = stats(PM.download, endswith=extract_name)
+        return logs, size
+
+    # Every edition is a different file, so they can be fetched concurrently.
+    # Bounded, to be polite with kaikki. Logged in submission order.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        # Download editions (English only downloads the filtered en-en)
+        results = executor.map(
+            download,
+            [[source, source] for source in with_edition],
+            [f"{source}-extract.jsonl" for source in with_edition],
+        )
+        for source, (logs, size) in zip(with_edition, results):
+            for logline in logs:
+                log(logline)
+            log(f"dl-{source}", f"Finished download ({size})")
 
-    # Download the rest of the filtered English jsonlines
+    # Download the rest of the filtered English jsonlines.
+    # Serially: they all resolve to the same unfiltered English dump. If the en-en
+    # download failed, concurrent workers would race to download it into one file.
     if "en" in with_edition:
         for source in isos:
-            label = f"dl-{source}-en"
-            params = f"{source} en"
-            _, logs = run_cmd(
-                odir, "download", params, args, print_download_status=True
-            )
+            logs, size = download([source, "en"], f"{source}-en-extract.jsonl")
             for logline in logs:
                 log(logline)
-            _, size = stats(PM.download, endswith=f"{source}-en-extract.jsonl")
-            log(label, f"Finished download ({size})")
+            log(f"dl-{source}-en", f"Finished download ({size})")
 
     _, total_size = stats(PM.download)
     elapsed = time.perf_counter() - start
@@ -598,9 +707,7 @@ def run_download(
 
 
 def build_release(args: Args) -> None:
-    with PM.languages_json.open() as f:
-        data = json.load(f)
-        langs = [load_lang(row) for row in data]
+    langs = load_langs(PM.languages_json)
 
     run_matrix(langs, args)
 
@@ -623,23 +730,32 @@ def extract_indexes() -> None:
     PM.index.mkdir(exist_ok=True)
 
     log("index", "Extracting indexes...")
-    n_indexes = 0
 
-    for zip_path in PM.dictionary.rglob("*.zip"):
-        index_path = PM.index / f"{zip_path.stem}-index.json"
+    zip_paths = [
+        Path(entry.path)
+        for entry in iter_files(PM.dictionary)
+        if entry.name.endswith(".zip")
+    ]
+    # Small reads and writes: threads overlap the IO
+    with ThreadPoolExecutor(max_workers=CPU_COUNT) as executor:
+        # Consume the results so that a failed extraction raises here
+        list(executor.map(extract_index, zip_paths))
 
-        with zipfile.ZipFile(zip_path) as zf:
-            index_names = [name for name in zf.namelist() if name == "index.json"]
-            assert len(index_names) == 1, (
-                f"There should be exactly one index @ {zip_path}"
-            )
+    log("index", f"Extracted {len(zip_paths)} indexes")
+
+
+def extract_index(zip_path: Path) -> None:
+    index_path = PM.index / f"{zip_path.stem}-index.json"
 
-            index_name = index_names[0]
-            with zf.open(index_name) as src, index_path.open("wb") as dst:
-                n_indexes += 1
-                dst.write(src.read())
+    with zipfile.ZipFile(zip_path) as zf:
+        # Exactly one: with a duplicate member, getinfo would silently take the last
+        if zf.namelist().count("index.json") != 1:
+            raise AssertionError(f"There should be exactly one index @ {zip_path}")
+        index_info = zf.getinfo("index.json")
 
-    log("index", f"Extracted {n_indexes} indexes")
+        with zf.open(index_info) as src, index_path.open("wb") as dst:
+            # Stream in 1MB chunks: merged indexes can be large
+            shutil.copyfileobj(src, dst, 1 << 20)
 
 
 def parse_args() -> tuple[str, Args]:
@@ -647,16 +763,24 @@ def parse_args() -> tuple[str, Args]:
     parser.add_argument("command", choices=["build", "publish", "index"])
     parser.add_argument("-v", "--verbose", action="count", default=0)
     parser.add_argument("-n", "--dry-run", action="store_true")
-    parser.add_argument("-j", "--jobs", type=int, default=8)
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=8, help="0 uses every cpu (default: 8)"
+    )
     parser.add_argument(
         "-t", "--dictionary-type", choices=["main", "ipa", "ipa-merged"]
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the dictionaries already made by a previous (failed) run",
+    )
     args = parser.parse_args()
     return args.command, Args(
         verbose=args.verbose,
         dry_run=args.dry_run,
         jobs=args.jobs,
         dtype=args.dictionary_type,
+        resume=args.resume,
     )
 
 
@@ -4,6 +4,7 @@ Intended to diagnostic if we should or not remove small dictionaries from a rele
 """
 
 import argparse
+import sys
 from pathlib import Path
 
 
@@ -56,7 +57,7 @@ def main() -> None:
     args = parser.parse_args()
     if not args.folder.is_dir():
         print(f"Error: {args.folder} is not a directory")
-        exit(1)
+        sys.exit(1)
     scan_zip_sizes(args.folder)
 
 
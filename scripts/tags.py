@@ -3,7 +3,8 @@
 from collections import Counter
 import json
 from pathlib import Path
-from dataclasses import dataclass
+
+from common import WhitelistedTag
 
 ASSETS_PATH = Path("assets")
 
@@ -22,24 +23,11 @@ DOCUMENTED_YOMITAN_TAG_CATEGORIES = {
 }
 
 
-# duplicated from build
-@dataclass
-class WhitelistedTag:
-    short_tag: str
-    category: str
-    sort_order: str
-    # if array, first element will be used, others are aliases
-    long_tag_aliases: str | list[str]
-    popularity_score: int
-
-
 def main() -> None:
     tag_bank_path = ASSETS_PATH / "tag_bank_term.json"
     tag_order_path = ASSETS_PATH / "tag_order.json"
-    with tag_bank_path.open("r", encoding="utf-8") as f:
-        tag_bank = json.load(f)
-    with tag_order_path.open("r", encoding="utf-8") as f:
-        tag_order = json.load(f)
+    tag_bank = json.loads(tag_bank_path.read_bytes())
+    tag_order = json.loads(tag_order_path.read_bytes())
 
     order_tags = []
     for category, tags in tag_order.items():
@@ -53,32 +41,28 @@ def main() -> None:
     for wtag in wtags:
         if wtag.category:
             unique_wtags_categories[wtag.category] += 1
-    for cat in unique_wtags_categories:
-        assert cat in DOCUMENTED_YOMITAN_TAG_CATEGORIES
+    unknown_categories = (
+        unique_wtags_categories.keys() - DOCUMENTED_YOMITAN_TAG_CATEGORIES
+    )
+    assert not unknown_categories, f"unknown categories: {unknown_categories}"
     print(unique_wtags_categories)
 
+    # Short tags and aliases to their tag. The first tag of the bank wins.
+    wtag_index: dict[str, WhitelistedTag] = {}
+    for wtag in wtags:
+        for name in (wtag.short_tag, *wtag.long_tag_aliases):
+            wtag_index.setdefault(name, wtag)
+
     # Quick diagnostic search
     for category, otag in order_tags:
-        for wtag in wtags:
-            if (
-                otag == wtag.short_tag
-                or (
-                    isinstance(wtag.long_tag_aliases, list)
-                    and otag in wtag.long_tag_aliases
-                )
-                or (
-                    isinstance(wtag.long_tag_aliases, str)
-                    and otag == wtag.long_tag_aliases
-                )
-            ):
-                # print(f"       {otag} > {wtag.short_tag}")
-                if wtag.category:
-                    print(f"OC: {category}, BC: {wtag.category} ({otag})")
-                break
-        else:
+        wtag = wtag_index.get(otag)
+        if wtag is None:
             # Tag in tag_order.json but not in the bank
             # print(f"[miss] {otag}")
-            pass
+            continue
+        # print(f"       {otag} > {wtag.short_tag}")
+        if wtag.category:
+            print(f"OC: {category}, BC: {wtag.category} ({otag})")
 
 
 if __name__ == "__main__":
@@ -8,12 +8,16 @@ The registry is only intended to be used via git diffs, to check for updates.
 
 import argparse
 import json
-import re
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
 from pathlib import Path
 from typing import Any, Literal, TypedDict, cast, get_args
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 PATH_TESTS_DIR = Path("tests")
 PATH_TESTS_INPUT = PATH_TESTS_DIR / "kaikki"
@@ -61,19 +65,42 @@ Reg = dict[L, dict[L, list[RegValue]]]
 Timestamp = str
 Timestamps = dict[L, dict[L, list[Timestamp]]]
 
-
-def read_jsonl(text: str) -> list[Any]:
-    return [json.loads(line) for line in text.strip().splitlines()]
-
-
-def flatten_json(obj: Any, prefix: str = "") -> dict[str, str]:
-    items = {}
+FETCH_WORKERS = 16
+"""Concurrent fetches to kaikki.org. Keep it under the adapter's pool_maxsize."""
+
+SESSION = requests.Session()
+"""Every fetch goes to kaikki.org: reuse the connection (and TLS) across fetches."""
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504],
+            # Let the last failed response through to the [WARN] path below
+            raise_on_status=False,
+        ),
+    ),
+)
+
+
+def iter_jsonl(lines: Iterable[str | bytes]) -> Iterator[Any]:
+    return (json.loads(line) for line in lines if line.strip())
+
+
+def flatten_json(
+    obj: Any, prefix: str = "", items: dict[str, str] | None = None
+) -> dict[str, str]:
+    # Fill a single dict instead of merging one per nesting level
+    if items is None:
+        items = {}
     if isinstance(obj, dict):
         for k, v in obj.items():
-            items.update(flatten_json(v, f"{prefix}.{k}" if prefix else k))
+            flatten_json(v, f"{prefix}.{k}" if prefix else k, items)
     elif isinstance(obj, list):
         for i, v in enumerate(obj):
-            items.update(flatten_json(v, f"{prefix}[{i}]"))
+            flatten_json(v, f"{prefix}[{i}]", items)
     else:
         items[prefix] = str(obj)
     return items
@@ -83,8 +110,46 @@ def json_to_str(a: Any) -> str:
     return "\n".join(f"{k}: {v}" for k, v in sorted(flatten_json(a).items()))
 
 
-def json_similarity(a: Any, b: Any) -> float:
-    return SequenceMatcher(None, json_to_str(a), json_to_str(b)).ratio()
+def most_similar(a: Any, candidates: list[Any]) -> Any:
+    """Return the first candidate with the highest SequenceMatcher ratio against a.
+
+    The real_quick_ratio and quick_ratio upper bounds let us skip the full ratio of
+    candidates that can not beat the current best. The former only depends on the
+    lengths, so it is checked before set_seq2 (which indexes the candidate).
+
+    Python equality is not enough for an exact match (1 == True), the flattened
+    texts must be equal:
+
+    >>> most_similar({"word": "w", "x": 1}, [{"word": "w", "x": True}])
+    {'word': 'w', 'x': True}
+    >>> most_similar({"x": 1}, [{"x": True}, {"x": "1"}, {"x": 1}])
+    {'x': '1'}
+    """
+    a_str = json_to_str(a)
+    cand_strs = [json_to_str(cand) for cand in candidates]
+
+    # Ratio 1.0 means the very same text: return the first of those without scoring
+    for cand, cand_str in zip(candidates, cand_strs):
+        if cand_str == a_str:
+            return cand
+
+    sm = SequenceMatcher(None)
+    sm.set_seq1(a_str)
+    la = len(a_str)
+    best_ratio = -1.0
+    best = None
+    for cand, cand_str in zip(candidates, cand_strs):
+        # SequenceMatcher.real_quick_ratio
+        lb = len(cand_str)
+        if (2.0 * min(la, lb) / (la + lb) if la + lb else 1.0) <= best_ratio:
+            continue
+        sm.set_seq2(cand_str)
+        if sm.quick_ratio() <= best_ratio:
+            continue
+        ratio = sm.ratio()
+        if ratio > best_ratio:
+            best_ratio, best = ratio, cand
+    return best
 
 
 def get_test_path(source: L, target: L) -> Path:
@@ -92,36 +157,121 @@ def get_test_path(source: L, target: L) -> Path:
 
 
 def add_to_registry(registry: Reg, source: L, target: L, value: RegValue) -> None:
-    if source not in registry:
-        registry[source] = {target: []}
-    registry[source][target].append(value)
+    registry.setdefault(source, {}).setdefault(target, []).append(value)
 
 
-def update_registry_for_pair(source: L, target: L) -> tuple[Reg, Timestamps]:
+def add_timestamp(
+    timestamps: Timestamps, source: L, target: L, timestamp: Timestamp
+) -> None:
+    timestamps.setdefault(source, {}).setdefault(target, []).append(timestamp)
+
+
+def kaikki_url(word: str, target: L) -> str:
+    search_query = "/".join([word[0], word[:2], word])
+    # We can replace the "All languages combined" with the source but it requires
+    # knowing how to convert from an iso (en) to a long name (English)
+    if target == "en":
+        return f"https://kaikki.org/dictionary/All%20languages%20combined/meaning/{search_query}.jsonl"
+    else:
+        return f"https://kaikki.org/{target}wiktionary/All%20languages%20combined/meaning/{search_query}.jsonl"
+
+
+Page = tuple[requests.Response, list[Any]]
+"""A kaikki response and its parsed jsonl."""
+
+
+def fetch(url: str, since: Timestamp | None) -> Page:
+    """Return the response and its parsed jsonl (empty unless the fetch got a 200).
+
+    The body is parsed line by line as it streams in: only the parsed objects are
+    held (still the whole page), never the raw text alongside them.
+    If since is given, kaikki answers 304 when the page was not modified after it.
+    """
+    headers = {"If-Modified-Since": since} if since else None
+    with SESSION.get(url, timeout=30, stream=True, headers=headers) as resp:
+        jsonl = list(iter_jsonl(resp.iter_lines())) if resp.status_code == 200 else []
+    return resp, jsonl
+
+
+def json_key(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False)
+
+
+PrevPair = dict[str, tuple[RegValue, Timestamp]]
+"""Previous registry value and Last-Modified of a pair, by json_key of the test."""
+
+
+def index_prev_pair(
+    registry: Reg, timestamps: Timestamps, source: L, target: L
+) -> PrevPair:
+    # Custom tests are stored in the registry but have no timestamp
+    values = [
+        value
+        for value in registry.get(source, {}).get(target, [])
+        if value["url"] != "none"
+    ]
+    stamps = timestamps.get(source, {}).get(target, [])
+    if len(values) != len(stamps):
+        return {}
+    return {
+        json_key(value["json"]): (value, stamp)
+        for value, stamp in zip(values, stamps)
+        if stamp != "None"
+    }
+
+
+def update_registry_for_pair(
+    source: L, target: L, prev: PrevPair, pages: dict[str, Page]
+) -> tuple[Reg, Timestamps]:
     """Get registry and timestamps for the source-target language pair.
 
     Timestamps are given separatedly so that they can be also writen as such. Preventing
     noise in the registry diffs.
+
+    A test that is still the json we matched last time is only refetched if kaikki
+    modified its page since: otherwise the match would be the same.
+
+    The pages of this run (shared by every pair) are filled with the downloaded pages,
+    and read instead of fetching: the url only depends on the target and the word.
     """
     print(f"Updating {source}-{target} (registry)", flush=True)
     tests_path = get_test_path(source, target)
-    tests = read_jsonl(tests_path.read_text())
+    with tests_path.open("rb") as f:
+        tests = list(iter_jsonl(f))
 
     registry: Reg = {}
     timestamps: Timestamps = {}
 
-    for test in tests:
+    urls = [kaikki_url(test["word"], target) for test in tests]
+    keys = [json_key(test) for test in tests]
+
+    # One fetch per page not in pages yet. Only ask for a 304 if every test on the
+    # page can reuse its previous match.
+    sinces: dict[str, Timestamp | None] = {}
+    for url, key in zip(urls, keys):
+        if url in pages:
+            continue
+        since = prev[key][1] if key in prev else None
+        sinces[url] = since if sinces.get(url, since) == since else None
+
+    # The fetches are pure I/O: run them concurrently
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        fetched = dict(zip(sinces, executor.map(fetch, sinces, sinces.values())))
+    for url, page in fetched.items():
+        # A 304 has no body, and only holds for the previous matches of this pair
+        if page[0].status_code != 304:
+            pages[url] = page
+
+    for test, key, url in zip(tests, keys, urls):
         word = test["word"]
+        resp, jsonl = fetched.get(url) or pages[url]
 
-        search_query = "/".join([word[0], word[:2], word])
-        # We can replace the "All languages combined" with the source but it requires
-        # knowing how to convert from an iso (en) to a long name (English)
-        if target == "en":
-            url = f"https://kaikki.org/dictionary/All%20languages%20combined/meaning/{search_query}.jsonl"
-        else:
-            url = f"https://kaikki.org/{target}wiktionary/All%20languages%20combined/meaning/{search_query}.jsonl"
+        if resp.status_code == 304:
+            prev_value, last_modified = prev[key]
+            add_timestamp(timestamps, source, target, last_modified)
+            add_to_registry(registry, source, target, prev_value)
+            continue
 
-        resp = requests.get(url)
         if not resp.ok:
             print(
                 f"[WARN] (err. {resp.status_code}) Failed to fetch {word} @ {url}\n"
@@ -138,18 +288,9 @@ def update_registry_for_pair(source: L, target: L) -> tuple[Reg, Timestamps]:
             continue
 
         last_modified = resp.headers.get("Last-Modified", "None")
-        if source not in timestamps:
-            timestamps[source] = {target: []}
-        timestamps[source][target].append(last_modified)
+        add_timestamp(timestamps, source, target, last_modified)
 
-        text = resp.content.decode("utf-8")
-        jsonl = read_jsonl(text)
-
-        scores = [
-            (i, json_similarity(test, cand), cand) for i, cand in enumerate(jsonl)
-        ]
-        scores.sort(reverse=True, key=lambda x: x[1])
-        _, _, best_match = scores[0]
+        best_match = most_similar(test, jsonl)
 
         # reorder keys for visibility
         best_match = {
@@ -174,7 +315,11 @@ def validate_lang(lang: str) -> L:
     return cast(L, lang)
 
 
-FNAME_RE = re.compile(r"^([a-zA-Z]+)-([a-zA-Z]+)-extract\.jsonl$")
+FNAME_SUFFIX = "-extract.jsonl"
+
+
+def is_iso(s: str) -> bool:
+    return s.isascii() and s.isalpha()
 
 
 def get_lang_pairs_to_update(
@@ -183,13 +328,13 @@ def get_lang_pairs_to_update(
     lang_pairs: LangPairs = {}
 
     for file in PATH_TESTS_INPUT.iterdir():
-        m = FNAME_RE.match(file.name)
-        if not m:
+        # {source}-{target}-extract.jsonl
+        name = file.name
+        source_raw, _, target_raw = name.removesuffix(FNAME_SUFFIX).partition("-")
+        has_suffix = name.endswith(FNAME_SUFFIX)
+        if not (has_suffix and is_iso(source_raw) and is_iso(target_raw)):
             raise ValueError(f"Unexpected filename in {PATH_TESTS_INPUT}: {file.name}")
 
-        source_raw = m.group(1)
-        target_raw = m.group(2)
-
         if source_filter and source_raw != source_filter:
             continue
         if target_filter and target_raw != target_filter:
@@ -207,6 +352,18 @@ def get_lang_pairs_to_update(
     return lang_pairs
 
 
+def write_json(path: Path, obj: Any) -> None:
+    """Replace the json @ path atomically: a crash never leaves it truncated."""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def write_registry(registry: Reg, timestamps: Timestamps) -> None:
+    write_json(PATH_REGISTRY, registry)
+    write_json(PATH_REGISTRY_TIMESTAMPS, timestamps)
+
+
 def update_registry(lang_pairs: LangPairs, load_prev_registry: bool) -> None:
     """Update the registry with the given language pairs.
 
@@ -221,32 +378,42 @@ def update_registry(lang_pairs: LangPairs, load_prev_registry: bool) -> None:
     NOTE: there is no guarantee that the registry/timestamps will be sorted when
     loading previous data.
     """
+    # Always read: the previous timestamps drive the conditional fetches
+    prev_registry: Reg = {}
+    prev_timestamps: Timestamps = {}
+    if PATH_REGISTRY.exists():
+        prev_registry = json.loads(PATH_REGISTRY.read_bytes())
+    if PATH_REGISTRY_TIMESTAMPS.exists():
+        prev_timestamps = json.loads(PATH_REGISTRY_TIMESTAMPS.read_bytes())
+
     registry: Reg = {}
     timestamps: Timestamps = {}
 
     if load_prev_registry:
-        if PATH_REGISTRY.exists():
-            with PATH_REGISTRY.open() as f:
-                registry = json.load(f)
-        if PATH_REGISTRY_TIMESTAMPS.exists():
-            with PATH_REGISTRY_TIMESTAMPS.open() as f:
-                timestamps = json.load(f)
+        registry = prev_registry
+        timestamps = prev_timestamps
+
+    pages: dict[str, Page] = {}
 
     for source, targets in lang_pairs.items():
-        if source not in registry:
-            registry[source] = {}
-        if source not in timestamps:
-            timestamps[source] = {}
+        registry.setdefault(source, {})
+        timestamps.setdefault(source, {})
 
         for target in targets:
-            pair_registry, pair_timestamps = update_registry_for_pair(source, target)
-            registry[source][target] = pair_registry[source][target]
-            timestamps[source][target] = pair_timestamps[source][target]
+            prev = index_prev_pair(prev_registry, prev_timestamps, source, target)
+            pair_registry, pair_timestamps = update_registry_for_pair(
+                source, target, prev, pages
+            )
+            # .get: a pair with no tests, or whose fetches all failed, has no entry
+            registry[source][target] = pair_registry.get(source, {}).get(target, [])
+            timestamps[source][target] = pair_timestamps.get(source, {}).get(target, [])
+            # Checkpoint after each pair, so that a crash does not lose the pairs
+            # already fetched. Only when the previous registry was loaded: otherwise
+            # this would drop, until the end of the run, every pair not yet processed.
+            if load_prev_registry:
+                write_registry(registry, timestamps)
 
-    PATH_REGISTRY.write_text(json.dumps(registry, indent=2, ensure_ascii=False))
-    PATH_REGISTRY_TIMESTAMPS.write_text(
-        json.dumps(timestamps, indent=2, ensure_ascii=False)
-    )
+    write_registry(registry, timestamps)
 
 
 def update_tests() -> None:
@@ -254,17 +421,17 @@ def update_tests() -> None:
         print(f"{PATH_REGISTRY} not found. Run with flag '--update-registry' first.")
         return
 
-    registry: Reg = json.loads(PATH_REGISTRY.read_text())
+    registry: Reg = json.loads(PATH_REGISTRY.read_bytes())
 
     for source, target in registry.items():
         for target, registry_values in target.items():
-            new_tests: list[str] = [value["json"] for value in registry_values]
+            lines = [
+                json.dumps(value["json"], ensure_ascii=False) + "\n"
+                for value in registry_values
+            ]
             tests_path = get_test_path(source, target)
             print(f"Updating {source}-{target} (test)", flush=True)
-            with tests_path.open("w", encoding="utf-8") as f:
-                for new_test in new_tests:
-                    json.dump(new_test, f, ensure_ascii=False)
-                    f.write("\n")
+            tests_path.write_text("".join(lines), encoding="utf-8")
 
 
 def main() -> None: